@@ -13,11 +13,28 @@ All prices in USD.
 import os
 import uuid
 INSTANCE_ID = str(uuid.uuid4())[:8]
+import bisect
+import heapq
 import json
+import logging
+import queue
+import sqlite3
 import time
 import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import QueueHandler, QueueListener
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# orjson decodes 2-4x faster than stdlib json and takes bytes directly,
+# which matters for the multi-token DexScreener responses (50-200 KB).
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 # ============ CONFIGURATION ============
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
@@ -27,8 +44,19 @@ PUSHOVER_API_TOKEN = os.getenv("PUSHOVER_API_TOKEN", "YOUR_PUSHOVER_API_TOKEN")
 # Only allow your Telegram user ID (set after first /start)
 ALLOWED_USER_ID = os.getenv("ALLOWED_USER_ID", "")  # Your Telegram user ID
 
-CHECK_INTERVAL = 10  # seconds between price checks
-DATA_FILE = "tokens_data.json"
+CHECK_INTERVAL = 10  # seconds between scheduler passes / default retry delay
+MIN_CHECK_INTERVAL = 2   # seconds, for tokens about to trip their target
+MAX_CHECK_INTERVAL = 60  # seconds, for tokens far from their target
+DB_FILE = "tokens.db"
+
+# Webhook mode: Telegram pushes updates to us instead of us long-polling.
+# Requires a publicly reachable HTTPS URL (e.g. the Heroku app URL).
+# Long polling stays the default for local dev / unreachable hosts.
+USE_WEBHOOK = os.getenv("USE_WEBHOOK", "").lower() in ("1", "true", "yes")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PORT = int(os.getenv("PORT", "8443"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "") or uuid.uuid4().hex
+LEGACY_DATA_FILE = "tokens_data.json"  # pre-SQLite persistence, imported once
 
 # ============ API ENDPOINTS ============
 JUPITER_API_KEY = os.getenv("JUPITER_API_KEY", "").strip()
@@ -40,9 +68,54 @@ JUPITER_PRICE_URL = (
 JUPITER_TOKEN_BASE = "https://api.jup.ag" if JUPITER_API_KEY else "https://lite-api.jup.ag"
 DEXSCREENER_BASE = "https://api.dexscreener.com"
 
+# Hoisted URL prefixes so hot-path callers only pay a concat, not a rebuild
+DEX_BULK_URL = f"{DEXSCREENER_BASE}/latest/dex/tokens/"
+TELEGRAM_API_BASE = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
+
 # DexScreener chain ids for EVM addresses. First one that returns a price wins.
 EVM_CHAINS = ["ethereum", "bsc", "robinhood", "base"]
 
+# Chain marker shown in /list (anything else gets 🔶)
+CHAIN_EMOJI = {
+    "solana": "☀️",
+    "ethereum": "🔷",
+    "robinhood": "🪶",
+    "base": "🔵",
+}
+
+# Shared session so the TLS connection to api.telegram.org (and the price APIs)
+# is reused between calls instead of paying a fresh handshake every time.
+# Pooled connections plus automatic retries on 429/5xx with backoff.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=4,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+    ),
+))
+
+# Bounded pool for overlapping independent HTTP fetches. Kept small so we
+# don't trip DexScreener/Jupiter rate limits (429s).
+_HTTP_POOL = ThreadPoolExecutor(max_workers=16)
+
+# ============ LOGGING ============
+# Log calls on the hot paths are just an in-memory queue put; a background
+# listener thread does the actual stdout writes, so the monitor and polling
+# loops never block on console I/O.
+_log_queue = queue.Queue(-1)
+logger = logging.getLogger("reversal_bot")
+logger.setLevel(logging.DEBUG if os.getenv("DEBUG") else logging.INFO)
+logger.addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(
+    _log_queue, logging.StreamHandler(), respect_handler_level=True
+)
+_log_listener.start()
+
 
 def detect_chain(address):
     """Return 'solana' for base58 addresses, 'evm' for 0x addresses, else None."""
@@ -67,28 +140,29 @@ def fetch_jupiter_price(token_address):
     # Price
     try:
         url = f"{JUPITER_PRICE_URL}?ids={token_address}"
-        resp = requests.get(url, headers=headers, timeout=15)
+        resp = SESSION.get(url, headers=headers, timeout=15)
         if resp.status_code == 200:
-            data = resp.json()
+            data = json_loads(resp.content)
             info = data.get(token_address)
             if info and "usdPrice" in info:
                 price = float(info["usdPrice"])
-    except Exception as e:
-        print(f"Jupiter price error: {e}")
+    except (requests.RequestException, ValueError, TypeError) as e:
+        # TypeError covers Jupiter's "usdPrice": null for unpriced tokens
+        logger.error(f"Jupiter price error: {e}")
     # Symbol / name
     try:
         url = f"{JUPITER_TOKEN_BASE}/tokens/v2/search?query={token_address}"
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = SESSION.get(url, headers=headers, timeout=10)
         if resp.status_code == 200:
-            data = resp.json()
+            data = json_loads(resp.content)
             if isinstance(data, list):
                 for tok in data:
                     if tok.get("id") == token_address or tok.get("address") == token_address:
                         symbol = tok.get("symbol")
                         name = tok.get("name")
                         break
-    except Exception as e:
-        print(f"Jupiter symbol error: {e}")
+    except (requests.RequestException, ValueError) as e:
+        logger.error(f"Jupiter symbol error: {e}")
 
     if price is None:
         return None
@@ -102,17 +176,45 @@ def fetch_jupiter_price(token_address):
     }
 
 
+# DexScreener responses for quiet tokens are byte-identical between polls;
+# conditional requests (If-None-Match) turn those into bodyless 304s, so we
+# skip both the transfer and the JSON parse. Keyed by full request URL.
+_etag_cache = {}
+_etag_lock = threading.Lock()
+
+
+def _get_with_etag(url, timeout):
+    """GET with an If-None-Match header; on 304 return the cached parsed body.
+
+    Returns the parsed JSON, or None on non-200 responses. Raises on
+    transport errors like a plain SESSION.get.
+    """
+    with _etag_lock:
+        cached = _etag_cache.get(url)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    resp = SESSION.get(url, headers=headers, timeout=timeout)
+    if resp.status_code == 304 and cached:
+        return cached[1]
+    if resp.status_code != 200:
+        return None
+    data = json_loads(resp.content)
+    etag = resp.headers.get("ETag")
+    if etag:
+        with _etag_lock:
+            if len(_etag_cache) > 512:  # watchlist-sized, keep it bounded
+                _etag_cache.clear()
+            _etag_cache[url] = (etag, data)
+    return data
+
+
 def fetch_dexscreener_price(token_address):
     """Fetch EVM token price (USD) from DexScreener, trying each chain, highest liquidity pair."""
     for chain in EVM_CHAINS:
         url = f"{DEXSCREENER_BASE}/tokens/v1/{chain}/{token_address}"
         try:
-            resp = requests.get(url, timeout=15)
-            if resp.status_code != 200:
-                continue
-            pairs = resp.json()
-        except Exception as e:
-            print(f"DexScreener error ({chain}): {e}")
+            pairs = _get_with_etag(url, timeout=15)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"DexScreener error ({chain}): {e}")
             continue
 
         if not isinstance(pairs, list) or not pairs:
@@ -156,8 +258,37 @@ def fetch_dexscreener_price(token_address):
     return None
 
 
+# Collapses duplicate lookups for the same CA within a few seconds (/add
+# validation racing the monitor, /status and /list overlapping, etc.).
+# 5s of staleness is invisible next to the polling cadence.
+PRICE_CACHE_TTL = 5
+_price_cache = {}  # ca -> (expires_at, info)
+_price_cache_lock = threading.Lock()
+
+
 def get_token_price(token_address):
-    """Unified price fetch: Solana via Jupiter, EVM via DexScreener. Returns USD price."""
+    """Unified price fetch: Solana via Jupiter, EVM via DexScreener. Returns USD price.
+
+    Results are memoized for PRICE_CACHE_TTL seconds so concurrent callers
+    share one HTTP request instead of hitting the APIs twice.
+    """
+    now = time.monotonic()
+    with _price_cache_lock:
+        hit = _price_cache.get(token_address)
+        if hit and hit[0] > now:
+            return hit[1]
+
+    info = _fetch_token_price(token_address)
+    if info:
+        with _price_cache_lock:
+            if len(_price_cache) > 2048:  # bound memory on junk addresses
+                _price_cache.clear()
+            _price_cache[token_address] = (now + PRICE_CACHE_TTL, info)
+    return info
+
+
+def _fetch_token_price(token_address):
+    """Uncached price fetch, dispatching on address format."""
     chain_type = detect_chain(token_address)
     if chain_type == "solana":
         return fetch_jupiter_price(token_address)
@@ -170,31 +301,319 @@ def get_token_price(token_address):
             return result
         return fetch_dexscreener_price(token_address)
 
+
+def fetch_jupiter_prices_bulk(addresses):
+    """Fetch USD prices for many Solana tokens at once (Jupiter accepts comma-joined ids)."""
+    headers = {"x-api-key": JUPITER_API_KEY} if JUPITER_API_KEY else {}
+    results = {}
+    for i in range(0, len(addresses), 50):
+        chunk = addresses[i:i + 50]
+        try:
+            url = f"{JUPITER_PRICE_URL}?ids={','.join(chunk)}"
+            resp = SESSION.get(url, headers=headers, timeout=15)
+            if resp.status_code != 200:
+                continue
+            data = json_loads(resp.content)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Jupiter bulk price error: {e}")
+            continue
+        for addr in chunk:
+            info = data.get(addr)
+            if not info:
+                continue
+            try:
+                price = float(info["usdPrice"])
+            except (KeyError, ValueError, TypeError):
+                # Jupiter returns "usdPrice": null for unpriced tokens
+                continue
+            results[addr] = {
+                "price": price,
+                "name": "Unknown",
+                "symbol": "???",
+                "liquidity": 0,
+                "chain": "solana",
+                "price_unit": "USD",
+            }
+    return results
+
+
+def fetch_dexscreener_prices_bulk(addresses):
+    """Fetch USD prices for many EVM tokens at once (DexScreener takes up to 30 per call)."""
+    results = {}
+    for i in range(0, len(addresses), 30):
+        chunk = addresses[i:i + 30]
+        url = DEX_BULK_URL + ",".join(chunk)
+        try:
+            data = _get_with_etag(url, timeout=15)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"DexScreener bulk error: {e}")
+            continue
+        pairs = (data or {}).get("pairs") or []
+
+        wanted = {a.lower(): a for a in chunk}
+        best_liq = {}
+        for pair in pairs:
+            base = pair.get("baseToken") or {}
+            addr = wanted.get(str(base.get("address", "")).lower())
+            if not addr:
+                continue
+            price_str = pair.get("priceUsd")
+            if not price_str:
+                continue
+            try:
+                price = float(price_str)
+            except (ValueError, TypeError):
+                continue
+            try:
+                liq = float((pair.get("liquidity") or {}).get("usd", 0) or 0)
+            except (ValueError, TypeError):
+                liq = 0.0
+            if liq > best_liq.get(addr, -1):
+                best_liq[addr] = liq
+                results[addr] = {
+                    "price": price,
+                    "name": base.get("name") or "Unknown",
+                    "symbol": base.get("symbol") or "???",
+                    "liquidity": liq if liq > 0 else 0,
+                    "chain": pair.get("chainId", "evm"),
+                    "price_unit": "USD",
+                }
+    return results
+
+
+def get_token_prices_bulk(addresses):
+    """Fetch prices for a whole watchlist in as few HTTP calls as possible.
+
+    Splits addresses by chain, batches each group (Jupiter and DexScreener
+    both accept multi-token queries), and falls back to per-token fetch for
+    anything with an unrecognized format. Returns {address: info} for every
+    token that resolved.
+    """
+    solana = []
+    evm = []
+    unknown = []
+    for addr in addresses:
+        chain_type = detect_chain(addr)
+        if chain_type == "solana":
+            solana.append(addr)
+        elif chain_type == "evm":
+            evm.append(addr)
+        else:
+            unknown.append(addr)
+
+    # Run the independent fetches concurrently; wall time is the slowest
+    # request instead of their sum.
+    futures = []
+    if solana:
+        futures.append(_HTTP_POOL.submit(fetch_jupiter_prices_bulk, solana))
+    if evm:
+        futures.append(_HTTP_POOL.submit(fetch_dexscreener_prices_bulk, evm))
+
+    results = {}
+    if unknown:
+        for addr, info in zip(unknown, _HTTP_POOL.map(get_token_price, unknown)):
+            if info:
+                results[addr] = info
+    for future in futures:
+        results.update(future.result())
+    return results
+
 # ============ GLOBAL STATE ============
 tokens = {}
 last_update_id = 0
 
+# Guards the shared tokens dict, which is mutated from both the Telegram
+# thread (handle_command) and the monitor thread. Snapshot under the lock
+# before any network call so the lock is never held across I/O.
+TOKENS_LOCK = threading.RLock()
+
+# Lookup indexes for /edit and /remove: a sorted CA list for O(log N)
+# prefix matching via bisect, and symbol -> CA so users can type the
+# ticker instead of the address. Maintained under TOKENS_LOCK.
+_sorted_cas = []
+_symbol_to_ca = {}
+
+
+def _alert_price(entry):
+    """Price at which this token alerts: bottom * (1 + target / 100).
+
+    Precomputed whenever the bottom or target changes, so the monitor's hot
+    loop is one float comparison per token instead of recomputing the
+    percent gain every tick.
+    """
+    return entry["local_bottom"] * (1.0 + entry["target_percent"] / 100.0)
+
+
+def _index_add(ca, symbol):
+    """Register a token in the lookup indexes. Caller holds TOKENS_LOCK."""
+    i = bisect.bisect_left(_sorted_cas, ca)
+    if i >= len(_sorted_cas) or _sorted_cas[i] != ca:
+        _sorted_cas.insert(i, ca)
+    if symbol:
+        _symbol_to_ca[symbol.upper()] = ca
+
+
+def _index_remove(ca, symbol):
+    """Drop a token from the lookup indexes. Caller holds TOKENS_LOCK."""
+    i = bisect.bisect_left(_sorted_cas, ca)
+    if i < len(_sorted_cas) and _sorted_cas[i] == ca:
+        del _sorted_cas[i]
+    if symbol and _symbol_to_ca.get(symbol.upper()) == ca:
+        del _symbol_to_ca[symbol.upper()]
+
+
+def _rebuild_index():
+    """Rebuild both indexes from the tokens dict (used after load)."""
+    global _sorted_cas
+    _sorted_cas = sorted(tokens)
+    _symbol_to_ca.clear()
+    for ca, data in tokens.items():
+        symbol = data.get("symbol")
+        if symbol:
+            _symbol_to_ca[symbol.upper()] = ca
+
+
+def find_tracked_token(query):
+    """Resolve a user-supplied /edit or /remove argument to a tracked CA.
+
+    Tries exact symbol first, then CA prefix via bisect, then falls back
+    to the old substring scan. Caller holds TOKENS_LOCK.
+    """
+    ca = _symbol_to_ca.get(query.upper())
+    if ca in tokens:
+        return ca
+    i = bisect.bisect_left(_sorted_cas, query)
+    if i < len(_sorted_cas) and _sorted_cas[i].startswith(query):
+        return _sorted_cas[i]
+    for ca in tokens:
+        if query in ca:
+            return ca
+    return None
+
+# SQLite in WAL mode: readers never block the writer, and each token update
+# is an O(1) row write instead of rewriting the whole state file. The dict
+# above stays as the in-memory working set; every mutation writes through.
+_db = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
+_db.execute("PRAGMA journal_mode=WAL")
+_db.execute("PRAGMA synchronous=NORMAL")
+_db.execute("PRAGMA busy_timeout=5000")
+_db.execute(
+    "CREATE TABLE IF NOT EXISTS tokens ("
+    "  ca TEXT PRIMARY KEY,"
+    "  target_percent REAL,"
+    "  local_bottom REAL,"
+    "  added_at TEXT,"
+    "  name TEXT,"
+    "  symbol TEXT,"
+    "  chain TEXT,"
+    "  price_unit TEXT"
+    ")"
+)
+_db_lock = threading.Lock()  # one connection shared across threads
+
+
+def db_upsert_token(ca, data):
+    """Persist one token row (add or full update)."""
+    try:
+        with _db_lock:
+            _db.execute(
+                "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    ca,
+                    data["target_percent"],
+                    data["local_bottom"],
+                    data.get("added_at", ""),
+                    data.get("name", "Unknown"),
+                    data.get("symbol", "???"),
+                    data.get("chain", "solana"),
+                    data.get("price_unit", "USD"),
+                ),
+            )
+    except Exception as e:
+        logger.error(f"Error saving token {ca}: {e}")
+
+
+def db_update_bottom(ca, price):
+    """Persist a new local bottom - the hot-path write, a single row update."""
+    try:
+        with _db_lock:
+            _db.execute("UPDATE tokens SET local_bottom = ? WHERE ca = ?", (price, ca))
+    except Exception as e:
+        logger.error(f"Error updating bottom for {ca}: {e}")
+
+
+def db_delete_token(ca):
+    """Remove one token row."""
+    try:
+        with _db_lock:
+            _db.execute("DELETE FROM tokens WHERE ca = ?", (ca,))
+    except Exception as e:
+        logger.error(f"Error deleting token {ca}: {e}")
+
+
+WAL_CHECKPOINT_INTERVAL = 300  # seconds between WAL truncations
+_last_wal_checkpoint = 0.0
+
 
-def save_tokens():
-    """Save tokens to file for persistence"""
+def maybe_checkpoint_wal(now):
+    """Fold the write-ahead log back into tokens.db every few minutes.
+
+    WAL mode already makes each bottom update an O(1) append; this is the
+    compaction half - without it the -wal file grows until SQLite's own
+    auto-checkpoint kicks in at an arbitrary moment, possibly mid-cycle.
+    """
+    global _last_wal_checkpoint
+    if now - _last_wal_checkpoint < WAL_CHECKPOINT_INTERVAL:
+        return
+    _last_wal_checkpoint = now
     try:
-        with open(DATA_FILE, 'w') as f:
-            json.dump(tokens, f, indent=2)
+        with _db_lock:
+            _db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
     except Exception as e:
-        print(f"Error saving tokens: {e}")
+        logger.error(f"WAL checkpoint error: {e}")
 
 
 def load_tokens():
-    """Load tokens from file"""
+    """Load tokens from SQLite, importing legacy tokens_data.json once if present."""
     global tokens
     try:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r') as f:
-                tokens = json.load(f)
-                print(f"Loaded {len(tokens)} tokens from file")
+        with _db_lock:
+            rows = _db.execute(
+                "SELECT ca, target_percent, local_bottom, added_at, name, symbol,"
+                " chain, price_unit FROM tokens"
+            ).fetchall()
+        if not rows and os.path.exists(LEGACY_DATA_FILE):
+            with open(LEGACY_DATA_FILE, 'r') as f:
+                legacy = json.load(f)
+            for ca, data in legacy.items():
+                db_upsert_token(ca, data)
+                data["alert_price"] = _alert_price(data)
+            tokens = legacy
+            _rebuild_index()
+            logger.info(f"Imported {len(tokens)} tokens from {LEGACY_DATA_FILE}")
+            return
+        tokens = {
+            ca: {
+                "target_percent": target_percent,
+                "local_bottom": local_bottom,
+                "added_at": added_at,
+                "name": name,
+                "symbol": symbol,
+                "chain": chain,
+                "price_unit": price_unit,
+            }
+            for ca, target_percent, local_bottom, added_at, name, symbol,
+                chain, price_unit in rows
+        }
+        for data in tokens.values():
+            data["alert_price"] = _alert_price(data)
+        _rebuild_index()
+        if tokens:
+            logger.info(f"Loaded {len(tokens)} tokens from {DB_FILE}")
     except Exception as e:
-        print(f"Error loading tokens: {e}")
+        logger.error(f"Error loading tokens: {e}")
         tokens = {}
+        _rebuild_index()
 
 
 def format_usd(price):
@@ -208,8 +627,6 @@ def format_usd(price):
 
 def send_pushover_alert(token_info, ca, percent_gain, local_bottom, price_unit):
     """Send emergency priority notification with SIREN sound"""
-    url = "https://api.pushover.net/1/messages.json"
-    
     payload = {
         "token": PUSHOVER_API_TOKEN,
         "user": PUSHOVER_USER_KEY,
@@ -218,7 +635,7 @@ def send_pushover_alert(token_info, ca, percent_gain, local_bottom, price_unit):
             f"📈 +{percent_gain:.1f}% від дна\n"
             f"💰 Поточна ціна: {format_usd(token_info['price'])}\n"
             f"📉 Локальне дно: {format_usd(local_bottom)}\n"
-            f"⏰ {datetime.now().strftime('%H:%M:%S')}"
+            f"⏰ {time.strftime('%H:%M:%S')}"
         ),
         "title": f"🔥 REVERSAL: {token_info['symbol']} +{percent_gain:.0f}%",
         "sound": "siren",
@@ -228,70 +645,91 @@ def send_pushover_alert(token_info, ca, percent_gain, local_bottom, price_unit):
     }
     
     try:
-        response = requests.post(url, data=payload, timeout=10)
+        response = SESSION.post(PUSHOVER_URL, data=payload, timeout=10)
         response.raise_for_status()
-        print(f"✅ Pushover alert sent for {token_info['symbol']}")
+        logger.info(f"✅ Pushover alert sent for {token_info['symbol']}")
         return True
-    except Exception as e:
-        print(f"❌ Error sending Pushover: {e}")
+    except requests.RequestException as e:
+        logger.error(f"❌ Error sending Pushover: {e}")
         return False
 
 
+TELEGRAM_MSG_LIMIT = 4096  # Telegram rejects longer sendMessage texts
+
+
 def send_telegram_message(chat_id, text):
-    """Send message via Telegram"""
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": "HTML"
-    }
-    try:
-        requests.post(url, json=payload, timeout=10)
-    except Exception as e:
-        print(f"Error sending Telegram message: {e}")
+    """Send message via Telegram, splitting oversize text at line breaks."""
+    url = f"{TELEGRAM_API_BASE}/sendMessage"
+    while text:
+        if len(text) <= TELEGRAM_MSG_LIMIT:
+            chunk, text = text, ""
+        else:
+            # Split on a newline so we never cut an HTML tag in half
+            split = text.rfind("\n", 0, TELEGRAM_MSG_LIMIT)
+            if split <= 0:
+                split = TELEGRAM_MSG_LIMIT
+            chunk, text = text[:split], text[split:].lstrip("\n")
+        payload = {
+            "chat_id": chat_id,
+            "text": chunk,
+            "parse_mode": "HTML"
+        }
+        try:
+            SESSION.post(url, json=payload, timeout=10)
+        except requests.RequestException as e:
+            logger.error(f"Error sending Telegram message: {e}")
+            return
 
 
 def initialize_telegram():
     """Clear webhook and drop pending updates to prevent conflicts on restart."""
     global last_update_id
-    base = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+    base = TELEGRAM_API_BASE
     
     # 1. Delete webhook and drop all pending updates
     try:
-        resp = requests.get(f"{base}/deleteWebhook?drop_pending_updates=true", timeout=10)
-        print(f"deleteWebhook: {resp.json().get('description', resp.status_code)}")
+        resp = SESSION.get(f"{base}/deleteWebhook?drop_pending_updates=true", timeout=10)
+        logger.info(f"deleteWebhook: {resp.json().get('description', resp.status_code)}")
     except Exception as e:
-        print(f"deleteWebhook error: {e}")
+        logger.error(f"deleteWebhook error: {e}")
     
     # 2. Flush the update queue by acknowledging everything up to now
     try:
-        resp = requests.get(f"{base}/getUpdates?offset=-1&timeout=0", timeout=10)
+        resp = SESSION.get(f"{base}/getUpdates?offset=-1&timeout=0", timeout=10)
         data = resp.json()
         results = data.get("result", [])
         if results:
             last_update_id = results[-1]["update_id"]
             # Confirm we've consumed them
-            requests.get(f"{base}/getUpdates?offset={last_update_id + 1}&timeout=0", timeout=10)
-            print(f"Flushed queue, last_update_id = {last_update_id}")
+            SESSION.get(f"{base}/getUpdates?offset={last_update_id + 1}&timeout=0", timeout=10)
+            logger.info(f"Flushed queue, last_update_id = {last_update_id}")
         else:
-            print("Update queue already empty")
+            logger.info("Update queue already empty")
     except Exception as e:
-        print(f"Flush error: {e}")
+        logger.error(f"Flush error: {e}")
 
 
 def get_telegram_updates():
-    """Get new messages from Telegram and immediately acknowledge them"""
+    """Get new messages from Telegram and immediately acknowledge them.
+
+    Returns a list of updates (empty on a normal long-poll timeout), or
+    None on errors so the caller can back off before re-polling.
+    """
     global last_update_id
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
-    params = {"offset": last_update_id + 1, "timeout": 25}
-    
+    url = f"{TELEGRAM_API_BASE}/getUpdates"
+    params = {
+        "offset": last_update_id + 1,
+        "timeout": 50,
+        "allowed_updates": json.dumps(["message"]),
+    }
+
     try:
-        response = requests.get(url, params=params, timeout=35)
-        data = response.json()
+        response = SESSION.get(url, params=params, timeout=60)
+        data = json_loads(response.content)
         # Detect conflict (another instance polling with same token)
         if not data.get("ok") and data.get("error_code") == 409:
-            print("⚠️ CONFLICT 409: Another bot instance is running with this token!")
-            return []
+            logger.warning("⚠️ CONFLICT 409: Another bot instance is running with this token!")
+            return None
         results = data.get("result", [])
         # Immediately advance offset so Telegram won't re-deliver these updates
         if results:
@@ -300,9 +738,9 @@ def get_telegram_updates():
     except requests.exceptions.ReadTimeout:
         # Normal for long polling - just retry
         return []
-    except Exception as e:
-        print(f"Error getting updates: {e}")
-        return []
+    except (requests.RequestException, ValueError) as e:
+        logger.error(f"Error getting updates: {e}")
+        return None
 
 
 def handle_command(chat_id, user_id, text):
@@ -349,7 +787,9 @@ def handle_command(chat_id, user_id, text):
             return
         
         # Check if already tracking
-        if ca in tokens:
+        with TOKENS_LOCK:
+            already_tracked = ca in tokens
+        if already_tracked:
             send_telegram_message(chat_id, f"⚠️ Already tracking this token.\nUse /edit to change target or /remove first.")
             return
         
@@ -362,7 +802,7 @@ def handle_command(chat_id, user_id, text):
             return
         
         # Add to tracking
-        tokens[ca] = {
+        entry = {
             "target_percent": target_percent,
             "local_bottom": token_info["price"],
             "added_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -371,7 +811,11 @@ def handle_command(chat_id, user_id, text):
             "chain": token_info.get("chain", "solana"),
             "price_unit": "USD"
         }
-        save_tokens()
+        entry["alert_price"] = _alert_price(entry)
+        with TOKENS_LOCK:
+            tokens[ca] = entry
+            _index_add(ca, entry["symbol"])
+        db_upsert_token(ca, entry)
         
         chain = token_info.get("chain", "solana")
         chain_name = {
@@ -406,19 +850,18 @@ def handle_command(chat_id, user_id, text):
             send_telegram_message(chat_id, "❌ Invalid percent. Use a number like 50")
             return
         
-        # Find matching CA (can be partial)
-        found_ca = None
-        for ca in tokens:
-            if ca.startswith(ca_to_edit) or ca_to_edit in ca:
-                found_ca = ca
-                break
-        
+        # Find matching CA (symbol, prefix or substring)
+        with TOKENS_LOCK:
+            found_ca = find_tracked_token(ca_to_edit)
+            if found_ca:
+                old_percent = tokens[found_ca]["target_percent"]
+                tokens[found_ca]["target_percent"] = new_percent
+                tokens[found_ca]["alert_price"] = _alert_price(tokens[found_ca])
+                entry = dict(tokens[found_ca])
+                symbol = entry.get("symbol", "Unknown")
+
         if found_ca:
-            old_percent = tokens[found_ca]["target_percent"]
-            tokens[found_ca]["target_percent"] = new_percent
-            save_tokens()
-            
-            symbol = tokens[found_ca].get("symbol", "Unknown")
+            db_upsert_token(found_ca, entry)
             msg = (
                 f"✅ <b>Target updated!</b>\n\n"
                 f"🪙 {symbol}\n"
@@ -431,42 +874,36 @@ def handle_command(chat_id, user_id, text):
     
     # /list - Show all tokens
     elif command == "/list":
-        if not tokens:
+        with TOKENS_LOCK:
+            snapshot = {ca: dict(data) for ca, data in tokens.items()}
+
+        if not snapshot:
             send_telegram_message(chat_id, "📋 No tokens being tracked.\n\nUse /add to add tokens.")
             return
-        
-        msg = "📋 <b>Tracked Tokens:</b>\n\n"
-        for ca, data in tokens.items():
-            current_info = get_token_price(ca)
+
+        infos = get_token_prices_bulk(list(snapshot))
+        lines = []
+        for ca, data in snapshot.items():
+            current_info = infos.get(ca)
             current_price = current_info["price"] if current_info else 0
             bottom = data["local_bottom"]
-            chain = data.get("chain", "solana")
-            if chain == "solana":
-                chain_emoji = "☀️"
-            elif chain == "ethereum":
-                chain_emoji = "🔷"
-            elif chain == "robinhood":
-                chain_emoji = "🪶"
-            elif chain == "base":
-                chain_emoji = "🔵"
-            else:
-                chain_emoji = "🔶"
-            
+            chain_emoji = CHAIN_EMOJI.get(data.get("chain", "solana"), "🔶")
+
             if bottom > 0 and current_price > 0:
                 percent_from_bottom = ((current_price - bottom) / bottom) * 100
                 status = f"+{percent_from_bottom:.1f}%" if percent_from_bottom >= 0 else f"{percent_from_bottom:.1f}%"
             else:
                 status = "N/A"
-            
-            msg += (
+
+            lines.append(
                 f"{chain_emoji} <b>{data['symbol']}</b>\n"
                 f"  📉 Bottom: {format_usd(bottom)}\n"
                 f"  💰 Now: {format_usd(current_price)} ({status})\n"
                 f"  🎯 Target: +{data['target_percent']}%\n"
-                f"  <code>{ca}</code>\n\n"
+                f"  <code>{ca}</code>\n"
             )
-        
-        send_telegram_message(chat_id, msg)
+
+        send_telegram_message(chat_id, "📋 <b>Tracked Tokens:</b>\n\n" + "\n".join(lines))
     
     # /remove CA - Remove token
     elif command == "/remove":
@@ -475,18 +912,17 @@ def handle_command(chat_id, user_id, text):
             return
         
         ca_to_remove = parts[1]
-        
-        # Find matching CA (can be partial)
-        found_ca = None
-        for ca in tokens:
-            if ca.startswith(ca_to_remove) or ca_to_remove in ca:
-                found_ca = ca
-                break
-        
+
+        # Find matching CA (symbol, prefix or substring)
+        with TOKENS_LOCK:
+            found_ca = find_tracked_token(ca_to_remove)
+            if found_ca:
+                symbol = tokens[found_ca].get("symbol", "Unknown")
+                del tokens[found_ca]
+                _index_remove(found_ca, symbol)
+
         if found_ca:
-            symbol = tokens[found_ca].get("symbol", "Unknown")
-            del tokens[found_ca]
-            save_tokens()
+            db_delete_token(found_ca)
             send_telegram_message(chat_id, f"✅ Removed {symbol} from tracking.")
         else:
             send_telegram_message(chat_id, "❌ Token not found in tracking list.")
@@ -505,7 +941,7 @@ def handle_command(chat_id, user_id, text):
         jupiter_status = "❌ Not responding"
         try:
             headers = {"x-api-key": JUPITER_API_KEY} if JUPITER_API_KEY else {}
-            resp = requests.get(f"{JUPITER_PRICE_URL}?ids={sol_mint}", headers=headers, timeout=10)
+            resp = SESSION.get(f"{JUPITER_PRICE_URL}?ids={sol_mint}", headers=headers, timeout=10)
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get(sol_mint, {}).get("usdPrice"):
@@ -523,7 +959,7 @@ def handle_command(chat_id, user_id, text):
         # Live check: DexScreener
         dex_status = "❌ Not responding"
         try:
-            resp = requests.get(f"{DEXSCREENER_BASE}/tokens/v1/ethereum/0xdac17f958d2ee523a2206206994597c13d831ec7", timeout=10)
+            resp = SESSION.get(f"{DEXSCREENER_BASE}/tokens/v1/ethereum/0xdac17f958d2ee523a2206206994597c13d831ec7", timeout=10)
             if resp.status_code == 200:
                 dex_status = "✅ Working"
             else:
@@ -531,9 +967,12 @@ def handle_command(chat_id, user_id, text):
         except Exception as e:
             dex_status = f"❌ Error: {str(e)[:50]}"
         
+        with TOKENS_LOCK:
+            tracked_count = len(tokens)
+
         msg = (
             f"🤖 <b>Bot Status</b>\n\n"
-            f"📊 Tracking: {len(tokens)} tokens\n"
+            f"📊 Tracking: {tracked_count} tokens\n"
             f"⏱ Check interval: {CHECK_INTERVAL}s\n"
             f"💱 Price: USD\n\n"
             f"<b>Jupiter (Solana):</b>\n"
@@ -549,111 +988,277 @@ def handle_command(chat_id, user_id, text):
         send_telegram_message(chat_id, "❓ Unknown command. Use /start for help.")
 
 
+# Per-token polling schedule, owned by the monitor thread only. Tokens
+# close to their alert target get short intervals; tokens far from it back
+# off, cutting request volume roughly in proportion to watchlist coldness.
+_check_heap = []   # (next_check_at, ca), lazily invalidated
+_next_check = {}   # authoritative per-CA next-check time
+
+
+def _schedule_check(ca, when):
+    _next_check[ca] = when
+    heapq.heappush(_check_heap, (when, ca))
+
+
+def _check_delay(gap):
+    """Seconds until the next check for a token `gap` percent below target."""
+    return min(max(gap * 0.3, MIN_CHECK_INTERVAL), MAX_CHECK_INTERVAL)
+
+
 def price_monitor_loop():
     """Background loop to check prices and detect reversals"""
     global tokens
-    
-    print("🔄 Price monitor started")
-    
+
+    logger.info("🔄 Price monitor started")
+
     while True:
         try:
             tokens_to_remove = []
-            
-            for ca, data in list(tokens.items()):
-                token_info = get_token_price(ca)
-                
+            now = time.time()
+
+            with TOKENS_LOCK:
+                snapshot = {ca: dict(data) for ca, data in tokens.items()}
+
+            # Newly added tokens are checked right away
+            for ca in snapshot:
+                if ca not in _next_check:
+                    _schedule_check(ca, now)
+
+            # Pop every token that's due, skipping stale heap entries
+            # (rescheduled or removed tokens)
+            due = []
+            while _check_heap and _check_heap[0][0] <= now:
+                when, ca = heapq.heappop(_check_heap)
+                if ca in snapshot and _next_check.get(ca) == when:
+                    # Drop the schedule entry while the token is in flight:
+                    # if this cycle dies mid-fetch, the re-seed pass above
+                    # picks the token up next cycle instead of starving it
+                    del _next_check[ca]
+                    due.append(ca)
+            for ca in list(_next_check):
+                if ca not in snapshot:
+                    del _next_check[ca]
+
+            infos = get_token_prices_bulk(due)
+
+            for ca in due:
+                data = snapshot[ca]
+                token_info = infos.get(ca)
+
                 if not token_info:
+                    _schedule_check(ca, now + CHECK_INTERVAL)
                     continue
-                
+
+                # Bulk price endpoints don't return metadata; use what we stored on /add
+                if token_info["symbol"] == "???" and data.get("symbol"):
+                    token_info["symbol"] = data["symbol"]
+
                 current_price = token_info["price"]
                 local_bottom = data["local_bottom"]
                 target_percent = data["target_percent"]
-                
+                symbol = data["symbol"]
+
                 # Update local bottom if price is lower
                 if current_price < local_bottom:
-                    tokens[ca]["local_bottom"] = current_price
-                    save_tokens()
-                    print(f"📉 {data['symbol']}: New bottom {format_usd(current_price)}")
+                    with TOKENS_LOCK:
+                        if ca in tokens:  # may have been /remove'd mid-cycle
+                            tokens[ca]["local_bottom"] = current_price
+                            tokens[ca]["alert_price"] = _alert_price(tokens[ca])
+                    db_update_bottom(ca, current_price)
+                    logger.info(f"📉 {symbol}: New bottom {format_usd(current_price)}")
+                    # Gain is back to zero, so the full target is the gap
+                    _schedule_check(ca, now + _check_delay(target_percent))
                     continue
-                
-                # Calculate percent gain from bottom
-                if local_bottom > 0:
+
+                if local_bottom <= 0:
+                    _schedule_check(ca, now + CHECK_INTERVAL)
+                    continue
+
+                # Hot-path check: one comparison against the precomputed
+                # trigger price; the gain is only computed on a hit / for logs
+                if current_price >= data["alert_price"]:
                     percent_gain = ((current_price - local_bottom) / local_bottom) * 100
-                    
-                    # Check if target reached
-                    if percent_gain >= target_percent:
-                        print(f"🚀 {data['symbol']}: +{percent_gain:.1f}% from bottom!")
-                        
-                        # Send Pushover alert
-                        send_pushover_alert(token_info, ca, percent_gain, local_bottom, "USD")
-                        
-                        # Mark for removal
-                        tokens_to_remove.append(ca)
-                    else:
-                        print(f"📊 {data['symbol']}: {format_usd(current_price)} (+{percent_gain:.1f}% from bottom, target: +{target_percent}%)")
+                    logger.info(f"🚀 {symbol}: +{percent_gain:.1f}% from bottom!")
+
+                    # Send Pushover alert off-thread so a slow Pushover
+                    # call (up to 10s) never stalls the price tick
+                    _HTTP_POOL.submit(
+                        send_pushover_alert, token_info, ca, percent_gain, local_bottom, "USD"
+                    )
+
+                    # Mark for removal
+                    tokens_to_remove.append(ca)
+                else:
+                    # Steady state: skip the f-string and price formatting
+                    # entirely unless someone is actually watching at DEBUG
+                    percent_gain = ((current_price - local_bottom) / local_bottom) * 100
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"📊 {symbol}: {format_usd(current_price)} (+{percent_gain:.1f}% from bottom, target: +{target_percent}%)")
+                    _schedule_check(ca, now + _check_delay(target_percent - percent_gain))
             
             # Remove triggered tokens
             for ca in tokens_to_remove:
-                symbol = tokens[ca].get("symbol", "Unknown")
-                del tokens[ca]
-                save_tokens()
-                print(f"🗑 Removed {symbol} after alert")
+                with TOKENS_LOCK:
+                    entry = tokens.pop(ca, None)
+                    if entry is not None:
+                        _index_remove(ca, entry.get("symbol"))
+                if entry is None:
+                    continue
+                db_delete_token(ca)
+                logger.info(f"🗑 Removed {entry.get('symbol', 'Unknown')} after alert")
         
+            maybe_checkpoint_wal(now)
+
         except Exception as e:
-            print(f"Error in monitor loop: {e}")
-        
-        time.sleep(CHECK_INTERVAL)
+            logger.error(f"Error in monitor loop: {e}")
+
+        # Sleep until the earliest scheduled check, capped so tokens added
+        # via /add mid-sleep are still picked up promptly
+        if _check_heap:
+            delay = _check_heap[0][0] - time.time()
+        else:
+            delay = CHECK_INTERVAL
+        time.sleep(min(max(delay, 1), CHECK_INTERVAL))
+
+
+# Commands are handled off the receiving thread so a slow /list (N price
+# fetches) never delays the next getUpdates long poll or webhook ack, and
+# the update offset keeps advancing while commands run.
+COMMAND_WORKERS = 4
+cmd_queue = queue.Queue(maxsize=1000)
+
+
+def _enqueue_command(chat_id, user_id, text):
+    try:
+        cmd_queue.put_nowait((chat_id, user_id, text))
+    except queue.Full:
+        logger.warning("⚠️ Command queue full, dropping message")
+
+
+def _command_worker_loop():
+    """Background loop: pull queued commands and handle them."""
+    while True:
+        chat_id, user_id, text = cmd_queue.get()
+        try:
+            handle_command(chat_id, user_id, text)
+        except Exception as e:
+            logger.error(f"Error handling command: {e}")
+        finally:
+            cmd_queue.task_done()
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    """Receives Telegram updates pushed to POST /tg/<secret> in webhook mode."""
+
+    def do_POST(self):
+        if (self.path != f"/tg/{WEBHOOK_SECRET}"
+                or self.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET):
+            self.send_response(403)
+            self.end_headers()
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            update = json_loads(self.rfile.read(length))
+        except Exception:
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        # Ack immediately so Telegram never waits on command handling
+        self.send_response(200)
+        self.end_headers()
+
+        message = update.get("message") or {}
+        if "text" in message:
+            chat_id = message["chat"]["id"]
+            user_id = message["from"]["id"]
+            text = message["text"]
+            logger.info(f"📨 [{INSTANCE_ID}] Message from {user_id}: {text}")
+            _enqueue_command(chat_id, user_id, text)
+
+    def log_message(self, format, *args):
+        pass  # keep per-request access logs off stdout
+
+
+def run_webhook_server():
+    """Register the webhook with Telegram and serve pushed updates forever."""
+    try:
+        resp = SESSION.get(f"{TELEGRAM_API_BASE}/setWebhook", params={
+            "url": f"{WEBHOOK_URL}/tg/{WEBHOOK_SECRET}",
+            "secret_token": WEBHOOK_SECRET,
+            "allowed_updates": json.dumps(["message"]),
+        }, timeout=10)
+        logger.info(f"setWebhook: {resp.json().get('description', resp.status_code)}")
+    except Exception as e:
+        logger.error(f"setWebhook error: {e}")
+
+    logger.info(f"🌐 Webhook server listening on port {WEBHOOK_PORT}")
+    ThreadingHTTPServer(("", WEBHOOK_PORT), _WebhookHandler).serve_forever()
 
 
 def telegram_loop():
     """Background loop to handle Telegram messages"""
     global last_update_id
     
-    print("📱 Telegram handler started")
+    logger.info("📱 Telegram handler started")
     
     while True:
         try:
             updates = get_telegram_updates()
-            
+
+            # Error path (409 conflict, network failure): a failed call
+            # returns instantly, so back off instead of hammering Telegram
+            if updates is None:
+                time.sleep(1)
+                continue
+
             for update in updates:
                 if "message" in update and "text" in update["message"]:
                     chat_id = update["message"]["chat"]["id"]
                     user_id = update["message"]["from"]["id"]
                     text = update["message"]["text"]
                     
-                    print(f"📨 [{INSTANCE_ID}] Message from {user_id}: {text}")
-                    handle_command(chat_id, user_id, text)
+                    logger.info(f"📨 [{INSTANCE_ID}] Message from {user_id}: {text}")
+                    _enqueue_command(chat_id, user_id, text)
         
         except Exception as e:
-            print(f"Error in Telegram loop: {e}")
-        
-        time.sleep(0.5)
+            logger.error(f"Error in Telegram loop: {e}")
+            time.sleep(1)  # avoid tight-looping if Telegram is unreachable
 
 
 def main():
-    print("=" * 60)
-    print("🤖 Solana Reversal Alert Bot")
-    print(f"Instance ID: {INSTANCE_ID}")
-    print("=" * 60)
-    print(f"Telegram Bot: Active")
-    print(f"Pushover: {'Configured' if PUSHOVER_USER_KEY != 'YOUR_PUSHOVER_USER_KEY' else 'NOT SET!'}")
-    print(f"Check interval: {CHECK_INTERVAL}s")
-    print(f"Price unit: USD")
-    print("=" * 60)
+    logger.info("=" * 60)
+    logger.info("🤖 Solana Reversal Alert Bot")
+    logger.info(f"Instance ID: {INSTANCE_ID}")
+    logger.info("=" * 60)
+    logger.info(f"Telegram Bot: Active")
+    logger.info(f"Pushover: {'Configured' if PUSHOVER_USER_KEY != 'YOUR_PUSHOVER_USER_KEY' else 'NOT SET!'}")
+    logger.info(f"Check interval: {CHECK_INTERVAL}s")
+    logger.info(f"Price unit: USD")
+    logger.info("=" * 60)
     
     # Load saved tokens
     load_tokens()
     
-    # Clear webhook and flush pending updates (prevents double-response after restarts)
-    print("Initializing Telegram connection...")
-    initialize_telegram()
-    
+    if not (USE_WEBHOOK and WEBHOOK_URL):
+        # Clear webhook and flush pending updates (prevents double-response after restarts)
+        logger.info("Initializing Telegram connection...")
+        initialize_telegram()
+
     # Start background threads
     monitor_thread = threading.Thread(target=price_monitor_loop, daemon=True)
     monitor_thread.start()
-    
-    # Run Telegram loop in main thread
-    telegram_loop()
+
+    for _ in range(COMMAND_WORKERS):
+        threading.Thread(target=_command_worker_loop, daemon=True).start()
+
+    if USE_WEBHOOK and WEBHOOK_URL:
+        # Telegram pushes updates to us - no polling at all
+        run_webhook_server()
+    else:
+        # Run Telegram long-polling loop in main thread
+        telegram_loop()
 
 
 if __name__ == "__main__":